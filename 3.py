@@ -10,8 +10,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from io import BytesIO
 from datetime import datetime
-from scipy import stats
 import os
+import hashlib
 
 # -------------------------------
 # PAGE CONFIG
@@ -46,6 +46,88 @@ with col2:
 
 st.write("---")
 
+# -------------------------------
+# DATA LOADING (cached across reruns)
+# -------------------------------
+@st.cache_data(show_spinner=False)
+def load_and_clean(file_bytes):
+    """Parse and clean the expense CSV once per distinct file content."""
+    try:
+        # pyarrow reads in parallel; ragged files fall back to the default parser
+        df = pd.read_csv(BytesIO(file_bytes), engine="pyarrow")
+    except (ImportError, ValueError):
+        df = pd.read_csv(BytesIO(file_bytes))
+
+    # Normalize column names
+    df.columns = [c.strip().capitalize() for c in df.columns]
+
+    # Detect important columns automatically
+    required_cols = {"Date", "Category", "Amount"}
+    optional_user_col = None
+    for col in df.columns:
+        if "user" in col.lower():
+            optional_user_col = col
+            break
+
+    if not required_cols.issubset(df.columns):
+        return None
+
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df.dropna(subset=["Date"], inplace=True)
+    df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0)
+    df["Month"] = df["Date"].dt.month_name()
+    # yyyymm as int32, cheaper to compare and group than period strings
+    df["YearMonth"] = (df["Date"].dt.year * 100 + df["Date"].dt.month).astype("int32")
+    df["Category"] = df["Category"].astype(str).str.title().str.strip().astype("category")
+
+    if optional_user_col:
+        df["User"] = df[optional_user_col].astype(str).str.title().str.strip().astype("category")
+    else:
+        df["User"] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), ["Default User"])
+
+    # Keep rows in date order for the searchsorted date-range filter
+    return df.sort_values("Date", kind="mergesort").reset_index(drop=True)
+
+
+@st.cache_data(show_spinner=False)
+def load_local(path, mtime):
+    """Load a file from disk; ``mtime`` invalidates the cache when it changes."""
+    with open(path, "rb") as f:
+        return load_and_clean(f.read())
+
+
+def isin_codes(col, values):
+    """Row mask for a User/Category multiselect, compared on category codes."""
+    codes = col.cat.codes.to_numpy()
+    wanted = col.cat.categories.get_indexer(values)
+    wanted = wanted[wanted >= 0].astype(codes.dtype)  # -1 would match missing values
+    if len(wanted) > 4:
+        return np.isin(codes, wanted)
+    mask = np.zeros(len(codes), dtype=bool)
+    for code in wanted:
+        mask |= codes == code
+    return mask
+
+
+@st.cache_data(show_spinner=False)
+def summarize(_filtered, data_key, users, cats, start_date, end_date):
+    """Monthly and per-category totals, recomputed only when the filters change."""
+    amounts = _filtered["Amount"].to_numpy(np.float64)
+
+    # Filtered rows keep the load-time date order, so each month is one run
+    ym = _filtered["YearMonth"].to_numpy()
+    starts = np.r_[0, np.flatnonzero(np.diff(ym)) + 1]
+    monthly = pd.Series(np.add.reduceat(amounts, starts), index=ym[starts], name="Amount")
+    monthly.index = pd.to_datetime(monthly.index.astype(str), format="%Y%m").strftime("%Y-%m")
+
+    cat_index = _filtered["Category"].cat.categories
+    codes = _filtered["Category"].cat.codes.to_numpy()
+    sums = np.bincount(codes, weights=amounts, minlength=len(cat_index))
+    seen = np.bincount(codes, minlength=len(cat_index)) > 0
+    category_sum = pd.Series(sums[seen], index=cat_index[seen], name="Amount").sort_values(ascending=False)
+    return monthly, category_sum, amounts.sum()
+
+
 # -------------------------------
 # SIDEBAR SETTINGS
 # -------------------------------
@@ -55,7 +137,8 @@ use_local = st.sidebar.checkbox("Use example dataset", value=True)
 if use_local:
     example_path = "/mnt/data/Datasets - expenses.csv"
     if os.path.exists(example_path):
-        df = pd.read_csv(example_path)
+        data_key = (example_path, os.path.getmtime(example_path))
+        df = load_local(*data_key)
         st.sidebar.success("✅ Loaded example dataset")
     else:
         st.sidebar.error("Example dataset not found!")
@@ -63,44 +146,18 @@ if use_local:
 else:
     uploaded_file = st.sidebar.file_uploader("Upload CSV (Date, Category, Amount, User)", type=["csv"])
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        file_bytes = uploaded_file.getvalue()
+        data_key = hashlib.md5(file_bytes).hexdigest()
+        df = load_and_clean(file_bytes)
         st.sidebar.success("✅ File uploaded successfully!")
     else:
         st.warning("Please upload a dataset.")
         st.stop()
 
-# -------------------------------
-# NORMALIZE COLUMN NAMES
-# -------------------------------
-df.columns = [c.strip().capitalize() for c in df.columns]
-
-# Detect important columns automatically
-required_cols = {"Date", "Category", "Amount"}
-optional_user_col = None
-for col in df.columns:
-    if "user" in col.lower():
-        optional_user_col = col
-        break
-
-if not required_cols.issubset(df.columns):
-    st.error(f"❌ Missing columns. File must contain: {', '.join(required_cols)}")
+if df is None:
+    st.error("❌ Missing columns. File must contain: Date, Category, Amount")
     st.stop()
 
-# -------------------------------
-# CLEANING
-# -------------------------------
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-df.dropna(subset=["Date"], inplace=True)
-df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0)
-df["Month"] = df["Date"].dt.month_name()
-df["YearMonth"] = df["Date"].dt.to_period("M").astype(str)
-df["Category"] = df["Category"].astype(str).str.title().str.strip()
-
-if optional_user_col:
-    df["User"] = df[optional_user_col].astype(str).str.title().str.strip()
-else:
-    df["User"] = "Default User"
-
 # -------------------------------
 # SIDEBAR FILTERS
 # -------------------------------
@@ -113,22 +170,31 @@ selected_users = st.sidebar.multiselect(
     help="Filter transactions by specific user(s)"
 )
 
-filtered = df[df["User"].isin(selected_users)]
+# Filters narrow down an array of row positions; the frame itself is only
+# materialized once, after the last filter.
+rows = np.flatnonzero(isin_codes(df["User"], selected_users))
 
 # Date range filter
-min_date, max_date = filtered["Date"].min(), filtered["Date"].max()
+user_dates = df["Date"].iloc[rows]
+min_date, max_date = user_dates.min(), user_dates.max()
 date_range = st.sidebar.date_input("Select date range", [min_date, max_date])
 start_date, end_date = date_range
-filtered = filtered[(filtered["Date"] >= pd.to_datetime(start_date)) & (filtered["Date"] <= pd.to_datetime(end_date))]
+start_ns, end_ns = np.datetime64(start_date, "ns"), np.datetime64(end_date, "ns")
+dates = user_dates.to_numpy()  # still date-sorted after the user filter
+lo = np.searchsorted(dates, start_ns, side="left")
+hi = np.searchsorted(dates, end_ns, side="right")
+rows = rows[lo:hi]
 
-if filtered.empty:
+if len(rows) == 0:
     st.warning("No data available for the selected user(s) or date range.")
     st.stop()
 
 # -------------------------------
 # MAIN PAGE CATEGORY FILTER
 # -------------------------------
-all_cats = sorted(filtered["Category"].unique())
+categories = df["Category"].cat.categories
+row_cat_codes = df["Category"].cat.codes.to_numpy()[rows]
+all_cats = list(categories[np.unique(row_cat_codes)])  # categories are sorted
 selected_categories = st.multiselect(
     "🎯 Select categories to analyze:",
     all_cats,
@@ -136,7 +202,8 @@ selected_categories = st.multiselect(
     help="Filter data interactively by expense category"
 )
 
-filtered = filtered[filtered["Category"].isin(selected_categories)]
+rows = rows[isin_codes(df["Category"].iloc[rows], selected_categories)]
+filtered = df.iloc[rows]
 
 if filtered.empty:
     st.warning("No transactions match your filters.")
@@ -145,9 +212,9 @@ if filtered.empty:
 # -------------------------------
 # METRICS
 # -------------------------------
-monthly = filtered.groupby("YearMonth")["Amount"].sum().sort_index()
-category_sum = filtered.groupby("Category")["Amount"].sum().sort_values(ascending=False)
-total_expense = filtered["Amount"].sum()
+monthly, category_sum, total_expense = summarize(
+    filtered, data_key, tuple(selected_users), tuple(selected_categories), start_date, end_date
+)
 avg_expense = monthly.mean() if not monthly.empty else 0
 
 # -------------------------------
@@ -176,7 +243,7 @@ with tab1:
         labels={"x": "Month", "y": "Amount (₹)"},
         color_discrete_sequence=px.colors.sequential.Teal
     )
-    st.plotly_chart(fig_trend, use_container_width=True)
+    st.plotly_chart(fig_trend, use_container_width=True, key="fig_trend")
 
     st.markdown("### Spending Distribution by Category")
     fig_pie = px.pie(
@@ -185,7 +252,7 @@ with tab1:
         title="Expense Breakdown by Category",
         hole=0.4
     )
-    st.plotly_chart(fig_pie, use_container_width=True)
+    st.plotly_chart(fig_pie, use_container_width=True, key="fig_pie")
 
 # Category Analysis
 with tab2:
@@ -199,17 +266,24 @@ with tab2:
         labels={"x": "Amount (₹)", "y": "Category"},
         color_discrete_sequence=px.colors.sequential.Blues
     )
-    st.plotly_chart(fig_cat, use_container_width=True)
+    st.plotly_chart(fig_cat, use_container_width=True, key="fig_cat")
 
 # Raw Data
 with tab3:
     st.markdown("### Filtered Expense Data")
-    st.dataframe(filtered.sort_values("Date", ascending=False))
+    # Rows are already date-sorted: reverse and cap instead of a full sort,
+    # so only the newest 1,000 rows are serialized to the browser.
+    st.dataframe(filtered.iloc[::-1].head(1000), use_container_width=True, key="raw_table")
+    if len(filtered) > 1000:
+        st.caption(f"Showing the latest 1,000 of {len(filtered):,} transactions — download the report for all rows.")
 
-    def to_excel_bytes(df_in):
+    # Exports are cached on the filter selection: the workbook is only rebuilt
+    # when the filters change, not on unrelated reruns such as a theme switch.
+    @st.cache_data(max_entries=4, show_spinner=False)
+    def to_excel_bytes(_df_in, filter_key, total_expense, avg_expense):
         out = BytesIO()
-        with pd.ExcelWriter(out, engine="openpyxl") as writer:
-            df_in.to_excel(writer, index=False, sheet_name="Expenses")
+        with pd.ExcelWriter(out, engine="xlsxwriter") as writer:
+            _df_in.to_excel(writer, index=False, sheet_name="Expenses")
             pd.DataFrame({
                 "Metric": ["Total Spent", "Avg Monthly"],
                 "Value": [total_expense, avg_expense]
@@ -217,7 +291,8 @@ with tab3:
         out.seek(0)
         return out.getvalue()
 
-    excel_bytes = to_excel_bytes(filtered)
+    filter_key = (data_key, tuple(selected_users), tuple(selected_categories), start_date, end_date)
+    excel_bytes = to_excel_bytes(filtered, filter_key, total_expense, avg_expense)
     st.download_button(
         "📥 Download Excel Report",
         data=excel_bytes,
@@ -225,6 +300,26 @@ with tab3:
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+    @st.cache_data(max_entries=4, show_spinner=False)
+    def to_parquet_bytes(_df_in, filter_key):
+        out = BytesIO()
+        try:
+            _df_in.to_parquet(out, index=False, compression="zstd")
+        except (ImportError, ValueError, TypeError):
+            return None  # no pyarrow, or mixed-type columns from the fallback parser
+        return out.getvalue()
+
+    parquet_bytes = to_parquet_bytes(filtered, filter_key)
+    if parquet_bytes is not None:
+        st.download_button(
+            "📦 Download Parquet",
+            data=parquet_bytes,
+            file_name="finance_summary.parquet",
+            mime="application/vnd.apache.parquet"
+        )
+    else:
+        st.caption("Parquet download is not available for this file.")
+
 # -------------------------------
 # FOOTER
 # -------------------------------
@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import threading
+from io import BytesIO
 
 # -------------------------------
 # PAGE CONFIG
@@ -12,6 +14,40 @@ st.set_page_config(page_title="Personal Finance Tracker", layout="centered")
 st.title("💰 Personal Finance Tracker (CSV Version)")
 st.write("Analyze your expenses, savings, and spending trends from a CSV file!")
 
+# -------------------------------
+# DATA LOADING (cached across reruns)
+# -------------------------------
+# Parsed once per distinct upload
+@st.cache_data(show_spinner=False)
+def load_and_clean(file_bytes):
+    df = pd.read_csv(BytesIO(file_bytes))
+    df.columns = [col.strip().capitalize() for col in df.columns]  # Normalize headers
+
+    required_cols = {'Date', 'Category', 'Amount'}
+    if not required_cols.issubset(df.columns):
+        return None
+
+    # Clean and process
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df.dropna(subset=['Date'], inplace=True)
+    df['Month'] = df['Date'].dt.month_name()
+    return df
+
+
+# Re-read only when the file's mtime changes
+@st.cache_data(show_spinner=False)
+def load_local(path, mtime):
+    with open(path, "rb") as f:
+        return load_and_clean(f.read())
+
+
+# One shared Figure/Axes for all sessions; draw under the returned lock
+@st.cache_resource
+def get_pie_fig():
+    fig, ax = plt.subplots()
+    return fig, ax, threading.Lock()
+
+
 # -------------------------------
 # USER INPUT
 # -------------------------------
@@ -23,14 +59,14 @@ use_local_file = st.checkbox("Use local CSV file from Downloads folder")
 if use_local_file:
     file_path = r"C:\Users\IT LAB-002\Downloads\Datasets - expenses.csv (1).csv"
     if os.path.exists(file_path):
-        df = pd.read_csv(file_path)
+        df = load_local(file_path, os.path.getmtime(file_path))
     else:
         st.error("❌ File not found at given path.")
         st.stop()
 else:
     uploaded_file = st.file_uploader("Upload your Expense CSV file", type=["csv"])
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        df = load_and_clean(uploaded_file.getvalue())
     else:
         st.info("Please upload a CSV file or select local file option.")
         st.stop()
@@ -38,18 +74,10 @@ else:
 # -------------------------------
 # PROCESS DATA
 # -------------------------------
-df.columns = [col.strip().capitalize() for col in df.columns]  # Normalize headers
-
-required_cols = {'Date', 'Category', 'Amount'}
-if not required_cols.issubset(df.columns):
-    st.error(f"Your file must contain columns: {', '.join(required_cols)}")
+if df is None:
+    st.error("Your file must contain columns: Date, Category, Amount")
     st.stop()
 
-# Clean and process
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-df.dropna(subset=['Date'], inplace=True)
-df['Month'] = df['Date'].dt.month_name()
-
 category_summary = df.groupby('Category')['Amount'].sum().sort_values(ascending=False)
 monthly_summary = df.groupby('Month')['Amount'].sum()
 
@@ -70,10 +98,12 @@ st.bar_chart(monthly_summary)
 
 # Pie chart
 st.write("### Spending Distribution")
-fig, ax = plt.subplots()
-ax.pie(category_summary, labels=category_summary.index, autopct='%1.1f%%', startangle=90)
-ax.axis("equal")
-st.pyplot(fig)
+fig, ax, fig_lock = get_pie_fig()
+with fig_lock:
+    ax.clear()
+    ax.pie(category_summary, labels=category_summary.index, autopct='%1.1f%%', startangle=90)
+    ax.axis("equal")
+    st.pyplot(fig)
 
 # -------------------------------
 # INSIGHTS
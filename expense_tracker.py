@@ -22,7 +22,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from io import BytesIO
 from datetime import datetime
-from scipy import stats
+import hashlib
 
 # -------------------------------
 # PAGE CONFIG
@@ -58,6 +58,114 @@ with col2:
 
 st.write("---")
 
+# -------------------------------
+# DATA LOADING (cached across reruns)
+# -------------------------------
+@st.cache_data(show_spinner=False)
+def load_and_clean(file_bytes):
+    """Parse, normalize and clean the uploaded CSV once per distinct file content.
+
+    Returns ``(df, has_user)``, or ``(None, False)`` when the required columns
+    cannot be found.
+    """
+    try:
+        # Multi-threaded pyarrow first; the C engine handles what it rejects
+        df = pd.read_csv(BytesIO(file_bytes), engine="pyarrow")
+    except (ImportError, ValueError):
+        df = pd.read_csv(BytesIO(file_bytes))
+
+    # Smart column detection
+    col_map = {c.lower(): c for c in df.columns}
+
+    def find_col(possible):
+        return next((col_map[p.lower()] for p in possible if p.lower() in col_map), None)
+
+    date_col = find_col(["date", "transaction date"])
+    cat_col = find_col(["category", "cat"])
+    amt_col = find_col(["amount", "amt", "value"])
+    user_col = find_col(["user", "name", "person"])
+
+    if not (date_col and cat_col and amt_col):
+        return None, False
+
+    df = df.rename(columns={date_col: "Date", cat_col: "Category", amt_col: "Amount"})
+    if user_col:
+        df = df.rename(columns={user_col: "User"})
+        df["User"] = df["User"].astype("category")
+
+    # Clean data
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = df.dropna(subset=["Date"])
+    df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0)
+    df["Month"] = df["Date"].dt.month_name()
+    # Numeric month key (e.g. 202401) for grouping
+    df["YearMonth"] = (df["Date"].dt.year * 100 + df["Date"].dt.month).astype("int32")
+    df["Category"] = df["Category"].astype(str).str.title().str.strip().astype("category")
+
+    # Sort once by date; the sidebar range then becomes a slice
+    df = df.sort_values("Date", kind="mergesort").reset_index(drop=True)
+    return df, bool(user_col)
+
+
+def isin_codes(col, values):
+    """Same as ``col.isin(values)``, but on the integer category codes."""
+    codes = col.cat.codes.to_numpy()
+    wanted = col.cat.categories.get_indexer(values)
+    wanted = wanted[wanted >= 0]
+    if pd.isna(values).any():
+        wanted = np.append(wanted, -1)  # a selected NaN keeps rows with a blank User
+    wanted = wanted.astype(codes.dtype)
+    if len(wanted) > 4:
+        return np.isin(codes, wanted)
+    mask = np.zeros(len(codes), dtype=bool)
+    for code in wanted:
+        mask |= codes == code
+    return mask
+
+
+@st.cache_data(show_spinner=False)
+def summarize(_filtered, data_key, users, cats, start_date, end_date):
+    """Totals for the active filters; ``_filtered`` is keyed by the filter args."""
+    amounts = _filtered["Amount"].to_numpy(np.float64)
+
+    # Date order survives the filters, so reduceat sums each month's run of rows
+    ym = _filtered["YearMonth"].to_numpy()
+    starts = np.r_[0, np.flatnonzero(np.diff(ym)) + 1]
+    monthly = pd.Series(np.add.reduceat(amounts, starts), index=ym[starts], name="Amount")
+    monthly.index = pd.to_datetime(monthly.index.astype(str), format="%Y%m").strftime("%Y-%m")
+
+    cat_index = _filtered["Category"].cat.categories
+    codes = _filtered["Category"].cat.codes.to_numpy()
+    sums = np.bincount(codes, weights=amounts, minlength=len(cat_index))
+    seen = np.bincount(codes, minlength=len(cat_index)) > 0
+    category_totals = pd.Series(sums[seen], index=cat_index[seen], name="Amount").sort_values(ascending=False)
+    return monthly, category_totals, amounts.sum()
+
+
+@st.cache_data(show_spinner=False)
+def compute_default_budgets(_df, data_key):
+    """Average monthly spend per category, used to seed the budget inputs."""
+    per_month = _df.groupby(["Category", "YearMonth"], observed=True)["Amount"].sum()
+    return per_month.groupby("Category", observed=True).mean().to_dict()
+
+
+def zscore_by_group(codes, amounts):
+    """Per-category z-score (population std) from bincount sums, in place."""
+    n_groups = codes.max() + 1 if len(codes) else 0
+    z = np.square(amounts)
+    counts = np.bincount(codes, minlength=n_groups)
+    mean = np.bincount(codes, weights=amounts, minlength=n_groups) / counts
+    var = np.bincount(codes, weights=z, minlength=n_groups) / counts - mean ** 2
+    std = np.sqrt(np.maximum(var, 0.0))
+    std[std == 0] = 1.0  # constant groups have no anomalies
+
+    per_row = np.take(mean, codes)
+    np.subtract(amounts, per_row, out=z)
+    np.take(std, codes, out=per_row)
+    z /= per_row
+    return z
+
+
 # -------------------------------
 # SIDEBAR — FILE UPLOAD
 # -------------------------------
@@ -68,43 +176,14 @@ if uploaded_file is None:
     st.warning("Please upload a CSV file with Date, Category, and Amount columns.")
     st.stop()
 
-df = pd.read_csv(uploaded_file)
-
-# -------------------------------
-# SMART COLUMN DETECTION
-# -------------------------------
-col_map = {c.lower(): c for c in df.columns}
-
-def find_col(possible):
-    for p in possible:
-        for k, v in col_map.items():
-            if p.lower() == k:
-                return v
-    return None
-
-date_col = find_col(["date", "transaction date"])
-cat_col = find_col(["category", "cat"])
-amt_col = find_col(["amount", "amt", "value"])
-user_col = find_col(["user", "name", "person"])
+file_bytes = uploaded_file.getvalue()
+data_key = hashlib.md5(file_bytes).hexdigest()
+df, has_user = load_and_clean(file_bytes)
 
-if not (date_col and cat_col and amt_col):
+if df is None:
     st.error("Your CSV must contain Date, Category, and Amount columns.")
     st.stop()
 
-df = df.rename(columns={date_col: "Date", cat_col: "Category", amt_col: "Amount"})
-if user_col:
-    df = df.rename(columns={user_col: "User"})
-
-# -------------------------------
-# CLEAN DATA
-# -------------------------------
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-df = df.dropna(subset=["Date"])
-df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0)
-df["Month"] = df["Date"].dt.month_name()
-df["YearMonth"] = df["Date"].dt.to_period("M").astype(str)
-df["Category"] = df["Category"].astype(str).str.title().str.strip()
-
 # -------------------------------
 # SIDEBAR — FILTERS
 # -------------------------------
@@ -115,7 +194,7 @@ date_range = st.sidebar.date_input("Date Range", [min_date, max_date], min_value
 all_cats = sorted(df["Category"].unique())
 sel_cats = st.sidebar.multiselect("Categories", all_cats, default=all_cats)
 
-if user_col:
+if has_user:
     all_users = sorted(df["User"].unique())
     sel_users = st.sidebar.multiselect("Users", all_users, default=all_users)
 else:
@@ -126,7 +205,7 @@ else:
 # -------------------------------
 st.sidebar.markdown("---")
 st.sidebar.subheader("💸 Budgets (Monthly)")
-default_budgets = (df.groupby(["Category", "YearMonth"])["Amount"].sum().groupby("Category").mean()).to_dict()
+default_budgets = compute_default_budgets(df, data_key)
 budgets = {}
 for cat in all_cats:
     default_val = float(default_budgets.get(cat, 500))
@@ -146,10 +225,17 @@ savings_target = st.sidebar.slider("Target Saving % of Income", 0, 100, 20)
 # FILTER DATA
 # -------------------------------
 start_date, end_date = date_range
-filtered = df[(df["Date"] >= pd.to_datetime(start_date)) & (df["Date"] <= pd.to_datetime(end_date))]
-filtered = filtered[filtered["Category"].isin(sel_cats)]
+start_ns, end_ns = np.datetime64(start_date, "ns"), np.datetime64(end_date, "ns")
+dates = df["Date"].values
+lo = np.searchsorted(dates, start_ns, side="left")
+hi = np.searchsorted(dates, end_ns, side="right")
+window = df.iloc[lo:hi]
+
+# Category and user conditions share one mask, so rows are copied only once
+mask = isin_codes(window["Category"], sel_cats)
 if sel_users:
-    filtered = filtered[filtered["User"].isin(sel_users)]
+    mask &= isin_codes(window["User"], sel_users)
+filtered = window.iloc[mask]
 
 if filtered.empty:
     st.warning("No transactions match your filters.")
@@ -158,19 +244,17 @@ if filtered.empty:
 # -------------------------------
 # COMPUTE STATS
 # -------------------------------
-monthly = filtered.groupby("YearMonth")["Amount"].sum().sort_index()
-category_totals = filtered.groupby("Category")["Amount"].sum().sort_values(ascending=False)
-total_spent = filtered["Amount"].sum()
+monthly, category_totals, total_spent = summarize(
+    filtered, data_key, tuple(sel_users or ()), tuple(sel_cats), start_date, end_date
+)
 avg_monthly = monthly.mean() if len(monthly) > 0 else 0.0
 
 # Budget comparison
-budget_df = pd.DataFrame({
-    "Category": all_cats,
-    "Actual": [category_totals.get(c, 0.0) for c in all_cats],
-    "Budget": [budgets.get(c, 0.0) for c in all_cats],
-})
-budget_df["Pct"] = (budget_df["Actual"] / budget_df["Budget"].replace({0: np.nan})) * 100
-budget_df = budget_df.fillna(0).sort_values("Pct", ascending=False)
+actual = category_totals.reindex(all_cats, fill_value=0.0).to_numpy(np.float64)
+budget = pd.Series(budgets, dtype=np.float64).reindex(all_cats, fill_value=0.0).to_numpy()
+budget_df = pd.DataFrame({"Category": all_cats, "Actual": actual, "Budget": budget})
+budget_df["Pct"] = np.divide(actual, budget, out=np.zeros_like(actual), where=budget > 0) * 100
+budget_df = budget_df.sort_values("Pct", ascending=False)
 
 # Savings system
 total_budget = sum(budgets.values())
@@ -180,11 +264,15 @@ goal_status = "✅ Goal Met" if savings >= savings_goal else "⚠️ Below Goal"
 
 # Forecast (trendline)
 if len(monthly) >= 3:
-    x = np.arange(len(monthly))
-    y = monthly.values
-    coeffs = np.polyfit(x, y, 1)
-    trend_line = np.polyval(coeffs, x)
-    forecast_next = float(np.polyval(coeffs, len(monthly)))
+    # Closed-form least squares for a degree-1 fit (no LAPACK call needed)
+    n = len(monthly)
+    x = np.arange(n, dtype=np.float64)
+    y = monthly.to_numpy(np.float64)
+    sx, sy, sxx, sxy = x.sum(), y.sum(), (x * x).sum(), (x * y).sum()
+    slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    intercept = (sy - slope * sx) / n
+    trend_line = slope * x + intercept
+    forecast_next = float(slope * n + intercept)
 else:
     trend_line = None
     forecast_next = None
@@ -207,19 +295,20 @@ tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "💰 Savings", "🔍 Deep Di
 # OVERVIEW TAB
 with tab1:
     st.markdown("### Spending by Category")
-    fig_cat = px.bar(category_totals.head(10), orientation="h", title="Top 10 Spending Categories")
-    st.plotly_chart(fig_cat, use_container_width=True)
+    top10 = category_totals.head(10)
+    fig_cat = px.bar(top10, orientation="h", title="Top 10 Spending Categories")
+    st.plotly_chart(fig_cat, use_container_width=True, key="fig_cat")
 
     st.markdown("### Monthly Trend")
     fig_trend = go.Figure()
     fig_trend.add_trace(go.Bar(x=monthly.index, y=monthly.values, name="Monthly Spend"))
     if trend_line is not None:
-        fig_trend.add_trace(go.Scatter(x=monthly.index, y=trend_line, mode="lines+markers", name="Trend"))
-    st.plotly_chart(fig_trend, use_container_width=True)
+        fig_trend.add_trace(go.Scattergl(x=monthly.index, y=trend_line, mode="lines+markers", name="Trend"))
+    st.plotly_chart(fig_trend, use_container_width=True, key="fig_trend")
 
     st.markdown("### Budget vs Actual")
     fig_budget = px.bar(budget_df, x="Category", y=["Actual", "Budget"], barmode="group")
-    st.plotly_chart(fig_budget, use_container_width=True)
+    st.plotly_chart(fig_budget, use_container_width=True, key="fig_budget")
 
 # SAVINGS TAB
 with tab2:
@@ -231,7 +320,7 @@ with tab2:
         delta={"reference": savings_goal, "increasing": {"color": "green"}},
         gauge={"axis": {"range": [None, savings_goal * 2]}, "bar": {"color": "green"}},
     ))
-    st.plotly_chart(fig_saving, use_container_width=True)
+    st.plotly_chart(fig_saving, use_container_width=True, key="fig_saving")
 
     st.markdown(f"**Target:** ₹{savings_goal:,.2f} | **Achieved:** ₹{savings:,.2f} ({savings_pct:.1f}%)")
 
@@ -243,7 +332,8 @@ with tab2:
 
 # DEEP DIVE TAB
 with tab3:
-    filtered["zscore"] = filtered.groupby("Category")["Amount"].transform(lambda x: stats.zscore(x.fillna(0)))
+    codes, _ = pd.factorize(filtered["Category"])
+    filtered["zscore"] = zscore_by_group(codes, filtered["Amount"].to_numpy(np.float64))
     anomalies = filtered[filtered["zscore"].abs() > 2.5]
     st.markdown("### Anomaly Detection")
     if not anomalies.empty:
@@ -254,19 +344,40 @@ with tab3:
 # DATA TAB
 with tab4:
     st.markdown("### Filtered Data")
-    st.dataframe(filtered)
-
-    def to_excel_bytes(df_in):
+    # Rows are already date-sorted: show the newest 1,000 without a full sort
+    st.dataframe(filtered.iloc[::-1].head(1000), use_container_width=True, key="raw_table")
+    if len(filtered) > 1000:
+        st.caption(f"Showing the latest 1,000 of {len(filtered):,} transactions — download below for all rows.")
+
+    # Exports are cached on the filter selection: files are only rebuilt when
+    # the filters change, not on unrelated reruns such as a theme switch.
+    @st.cache_data(max_entries=4, show_spinner=False)
+    def to_excel_bytes(_df_in, filter_key):
         out = BytesIO()
-        with pd.ExcelWriter(out, engine="openpyxl") as writer:
-            df_in.to_excel(writer, index=False, sheet_name="Filtered")
+        with pd.ExcelWriter(out, engine="xlsxwriter") as writer:
+            _df_in.to_excel(writer, index=False, sheet_name="Filtered")
         out.seek(0)
         return out.getvalue()
 
+    @st.cache_data(max_entries=4, show_spinner=False)
+    def to_parquet_bytes(_df_in, filter_key):
+        out = BytesIO()
+        try:
+            _df_in.to_parquet(out, index=False, compression="zstd")
+        except (ImportError, ValueError, TypeError):
+            return None  # no pyarrow, or mixed-type columns from the fallback parser
+        return out.getvalue()
+
     csv_bytes = filtered.to_csv(index=False).encode("utf-8")
-    xlsx_bytes = to_excel_bytes(filtered)
+    filter_key = (data_key, tuple(sel_users or ()), tuple(sel_cats), start_date, end_date)
+    xlsx_bytes = to_excel_bytes(filtered, filter_key)
     st.download_button("⬇️ Download CSV", data=csv_bytes, file_name="filtered_data.csv", mime="text/csv")
     st.download_button("⬇️ Download Excel", data=xlsx_bytes, file_name="finance_dashboard.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    parquet_bytes = to_parquet_bytes(filtered, filter_key)
+    if parquet_bytes is not None:
+        st.download_button("⬇️ Download Parquet", data=parquet_bytes, file_name="filtered_data.parquet", mime="application/vnd.apache.parquet")
+    else:
+        st.caption("Parquet download is not available for this file.")
 
 st.write("---")
 st.caption("Hackathon Pro Edition — Combining Insights, Budgets & Savings Goals.")
@@ -4,9 +4,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import plotly.express as px
 import os
-from sklearn.linear_model import LinearRegression
+import contextlib
+import hashlib
+import tempfile
+import time
+from io import BytesIO
 
 # -----------------------------------
 # PAGE CONFIG
@@ -15,6 +19,169 @@ st.set_page_config(page_title="💰 Personal Finance Tracker", layout="wide")
 st.title("💰 Personal Finance Tracker (Full CSV Version)")
 st.write("Analyze your expenses, savings, and spending trends using an easy upload or local CSV file.")
 
+# -----------------------------------
+# DATA LOADING (cached across reruns)
+# -----------------------------------
+_MONTH_NAMES = np.array([
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+])
+
+
+# Parquet copies live in a private folder next to the app, not shared /tmp;
+# file names carry the app name since each app cleans the data differently.
+# Bump the version when the cleaning steps change so stale copies are ignored.
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".finance_cache")
+_CACHE_PREFIX = "new"
+_CLEAN_VERSION = 3
+_CACHE_MAX_FILES = 20
+_CACHE_MAX_AGE = 7 * 24 * 3600  # seconds
+
+
+# Drop this app's copies older than _CACHE_MAX_AGE, then all but the newest
+# _CACHE_MAX_FILES, so uploaded data is neither kept forever nor unbounded
+def prune_cache():
+    paths = [
+        os.path.join(_CACHE_DIR, name) for name in os.listdir(_CACHE_DIR)
+        if name.startswith(f"{_CACHE_PREFIX}_") and name.endswith((".parquet", ".tmp"))
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    cutoff = time.time() - _CACHE_MAX_AGE
+    for i, path in enumerate(paths):
+        if i >= _CACHE_MAX_FILES or os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+# CSV bytes -> cleaned frame, or None when Date/Category/Amount are missing
+def parse_and_clean(file_bytes):
+    buf = BytesIO(file_bytes)
+
+    # Probe the header so dtypes can be declared against the file's own names
+    raw_cols = pd.read_csv(buf, nrows=0).columns
+    names = dict(zip(raw_cols.str.strip().str.capitalize(), raw_cols))
+    required_cols = {'Date', 'Category', 'Amount'}
+    if not required_cols.issubset(names):
+        return None
+
+    read_kwargs = dict(
+        dtype={names['Category']: 'category', names['Amount']: 'float64'},
+        parse_dates=[names['Date']],
+    )
+    try:
+        # pyarrow parses in parallel; the C engine covers a missing or strict pyarrow
+        buf.seek(0)
+        df = pd.read_csv(buf, engine='pyarrow', **read_kwargs)
+    except (ImportError, ValueError):
+        buf.seek(0)
+        df = pd.read_csv(buf, engine='c', **read_kwargs)
+    df.columns = df.columns.str.strip().str.capitalize()  # Normalize headers
+
+    # Clean and process
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df.dropna(subset=['Date'], inplace=True)
+    df = df[df['Amount'] > 0]  # Remove invalid entries
+
+    # Compact dtypes: int8 month numbers, with month names only as category
+    # labels. Amount stays float64: float32 sums drift at two decimals.
+    df['MonthNum'] = df['Date'].dt.month.astype('int8')
+    df['Month'] = pd.Categorical.from_codes(df['MonthNum'] - 1, _MONTH_NAMES)
+
+    # Sorted by date so the date-range filter is a searchsorted slice
+    return df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+
+
+# Cached per upload in memory, and as Parquet on disk so restarts skip the parse
+@st.cache_data(show_spinner=False)
+def load_and_clean(file_bytes):
+    digest = hashlib.md5(file_bytes).hexdigest()
+    cache_path = os.path.join(_CACHE_DIR, f"{_CACHE_PREFIX}_{digest}_v{_CLEAN_VERSION}.parquet")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < _CACHE_MAX_AGE:
+            return pd.read_parquet(cache_path, engine='pyarrow')
+    except (OSError, ValueError):
+        pass  # missing or unreadable copy: rebuild it below
+
+    df = parse_and_clean(file_bytes)
+    if df is not None:
+        tmp_path = None
+        try:
+            os.makedirs(_CACHE_DIR, mode=0o700, exist_ok=True)
+            # Write under a temp name and rename, so no session reads a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, prefix=f"{_CACHE_PREFIX}_", suffix=".tmp")
+            os.close(fd)
+            df.to_parquet(tmp_path, engine='pyarrow')
+            os.replace(tmp_path, cache_path)
+            tmp_path = None
+            prune_cache()
+        except (OSError, ValueError, TypeError):
+            # the on-disk copy is only an optimization (e.g. mixed-type columns)
+            if tmp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+    return df
+
+
+# mtime is part of the cache key, so edits to the file are picked up
+@st.cache_data(show_spinner=False)
+def load_local(path, mtime):
+    with open(path, "rb") as f:
+        return load_and_clean(f.read())
+
+
+# .isin() for the Category filter, done on the integer codes instead of labels
+def isin_codes(col, values):
+    codes = col.cat.codes.to_numpy()
+    wanted = col.cat.categories.get_indexer(values)
+    wanted = wanted[wanted >= 0]
+    if pd.isna(values).any():
+        wanted = np.append(wanted, -1)  # NaN is selected: keep rows with a blank Category
+    wanted = wanted.astype(codes.dtype)
+    if len(wanted) > 4:
+        return np.isin(codes, wanted)
+    mask = np.zeros(len(codes), dtype=bool)
+    for code in wanted:
+        mask |= codes == code
+    return mask
+
+
+# Pivot, monthly and daily totals for the current filters; _df is keyed by data_key, not hashed
+@st.cache_data(show_spinner=False)
+def summarize(_df, data_key, categories, start_date, end_date):
+    # The pivot drops blank-Category rows, so only the category margin comes from it
+    pivot = pd.pivot_table(_df, values='Amount', index='Category', columns='Month', aggfunc='sum', fill_value=0, observed=True)
+    category_summary = pivot.sum(axis=1)
+    # Monthly totals over every row: 13-bin bincount on MonthNum, months with rows only
+    month_num = _df['MonthNum'].to_numpy()
+    sums = np.bincount(month_num, weights=_df['Amount'].to_numpy(), minlength=13)[1:]
+    present = np.bincount(month_num, minlength=13)[1:] > 0
+    monthly_summary = pd.Series(
+        sums[present],
+        index=pd.CategoricalIndex(_MONTH_NAMES[present], categories=_MONTH_NAMES, ordered=True, name='Month'),
+    )
+    # Rows are date-sorted, so appearance order is already chronological
+    daily = _df.groupby('Date', sort=False)['Amount'].sum()
+    return category_summary, monthly_summary, pivot, daily
+
+
+# Export bytes, re-encoded only when the filter selection changes
+@st.cache_data(max_entries=4, show_spinner=False)
+def to_csv_bytes(_df, filter_key):
+    return _df.to_csv(index=False).encode('utf-8')
+
+
+# Least-squares slope/intercept of amount vs month number, from 13-bin bincounts
+def fit_line(months, amounts):
+    counts = np.bincount(months, minlength=13)
+    totals = np.bincount(months, weights=amounts, minlength=13)
+    m = np.arange(13, dtype=np.float64)
+    n = counts.sum()
+    sx, sy = (counts * m).sum(), totals.sum()
+    sxx, sxy = (counts * m * m).sum(), (totals * m).sum()
+    denom = n * sxx - sx * sx
+    slope = (n * sxy - sx * sy) / denom if denom else 0.0
+    return slope, (sy - slope * sx) / n
+
+
 # -----------------------------------
 # USER INPUT
 # -----------------------------------
@@ -27,14 +194,17 @@ use_local_file = st.sidebar.checkbox("Use local CSV file from Downloads folder")
 if use_local_file:
     file_path = r"C:\Users\IT LAB-002\Downloads\Datasets - expenses.csv (1).csv"
     if os.path.exists(file_path):
-        df = pd.read_csv(file_path)
+        data_key = (file_path, os.path.getmtime(file_path))
+        df = load_local(*data_key)
     else:
         st.error("❌ File not found at given path.")
         st.stop()
 else:
     uploaded_file = st.sidebar.file_uploader("Upload your Expense CSV file", type=["csv"])
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        file_bytes = uploaded_file.getvalue()
+        data_key = hashlib.md5(file_bytes).hexdigest()
+        df = load_and_clean(file_bytes)
     else:
         st.info("Please upload a CSV file or select local file option.")
         st.stop()
@@ -42,19 +212,10 @@ else:
 # -----------------------------------
 # PROCESS DATA
 # -----------------------------------
-df.columns = [col.strip().capitalize() for col in df.columns]  # Normalize headers
-required_cols = {'Date', 'Category', 'Amount'}
-
-if not required_cols.issubset(df.columns):
-    st.error(f"Your file must contain columns: {', '.join(required_cols)}")
+if df is None:
+    st.error("Your file must contain columns: Date, Category, Amount")
     st.stop()
 
-# Clean and process
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-df.dropna(subset=['Date'], inplace=True)
-df = df[df['Amount'] > 0]  # Remove invalid entries
-df['Month'] = df['Date'].dt.month_name()
-
 # -----------------------------------
 # SIDEBAR FILTERS
 # -----------------------------------
@@ -63,16 +224,22 @@ st.sidebar.header("🔍 Filters")
 start_date = st.sidebar.date_input("Start Date", df['Date'].min())
 end_date = st.sidebar.date_input("End Date", df['Date'].max())
 
-df = df[(df['Date'] >= pd.to_datetime(start_date)) & (df['Date'] <= pd.to_datetime(end_date))]
+start_ns, end_ns = np.datetime64(start_date, 'ns'), np.datetime64(end_date, 'ns')
+dates = df['Date'].to_numpy()
+lo = np.searchsorted(dates, start_ns, side='left')
+hi = np.searchsorted(dates, end_ns, side='right')
+df = df.iloc[lo:hi]
 
-categories = st.sidebar.multiselect("Select Categories", df['Category'].unique(), default=df['Category'].unique())
-df = df[df['Category'].isin(categories)]
+category_options = df['Category'].unique().tolist()
+categories = st.sidebar.multiselect("Select Categories", category_options, default=category_options)
+df = df[isin_codes(df['Category'], categories)]
 
 # -----------------------------------
 # SUMMARY CALCULATIONS
 # -----------------------------------
-category_summary = df.groupby('Category')['Amount'].sum().sort_values(ascending=False)
-monthly_summary = df.groupby('Month')['Amount'].sum()
+category_summary, monthly_summary, pivot, daily = summarize(
+    df, data_key, tuple(categories), start_date, end_date
+)
 
 avg_expense = np.mean(monthly_summary)
 total_expense = df['Amount'].sum()
@@ -98,17 +265,26 @@ with col2:
 # VISUALIZATIONS
 # -----------------------------------
 st.write("### Spending Distribution")
-fig, ax = plt.subplots()
-ax.pie(category_summary, labels=category_summary.index, autopct='%1.1f%%', startangle=90)
-ax.axis("equal")
-st.pyplot(fig)
+fig_pie = px.pie(names=category_summary.index, values=category_summary.values)
+st.plotly_chart(fig_pie, use_container_width=True, key="fig_pie")
 
 st.write("### Expense Trend Over Time")
-st.line_chart(df.groupby('Date')['Amount'].sum())
-
-pivot = pd.pivot_table(df, values='Amount', index='Category', columns='Month', aggfunc='sum', fill_value=0)
-st.write("### Category-wise Monthly Heatmap")
-st.dataframe(pivot.style.background_gradient(cmap="YlGnBu"))
+st.line_chart(daily)
+
+# Streamlit runs expander bodies even when collapsed, so the heavy content
+# is additionally gated on a checkbox stored in session state.
+with st.expander("🗺️ Category-wise Monthly Heatmap", expanded=False):
+    if st.checkbox("Show heatmap", key="show_heatmap"):
+        fig_heatmap = px.imshow(
+            pivot.to_numpy(),
+            x=pivot.columns.astype(str).tolist(),
+            y=pivot.index.astype(str).tolist(),
+            color_continuous_scale="YlGnBu",
+            text_auto=".0f",
+            aspect="auto",
+            labels={"x": "Month", "y": "Category", "color": "Amount (₹)"},
+        )
+        st.plotly_chart(fig_heatmap, use_container_width=True, key="fig_heatmap")
 
 # -----------------------------------
 # INSIGHTS
@@ -121,7 +297,7 @@ col2.metric("Estimated Monthly Savings", f"₹{savings:,.2f}")
 col3.metric("Savings Percentage", f"{savings_percentage:.2f}%")
 
 # Top spending day
-daily_max = df.groupby('Date')['Amount'].sum().idxmax()
+daily_max = daily.index[daily.to_numpy().argmax()]
 st.write(f"🗓️ **Most expensive day:** {daily_max.strftime('%d %B %Y')}")
 
 # Savings suggestions
@@ -132,7 +308,7 @@ elif savings_percentage > 40:
 
 # Top 3 categories
 st.write("### 🏆 Top 3 Spending Categories:")
-top3 = category_summary.head(3)
+top3 = category_summary.nlargest(3)  # heap select, no full sort
 for cat, val in top3.items():
     st.write(f"- {cat}: ₹{val:,.2f}")
 
@@ -153,11 +329,11 @@ if goal > 0:
 st.subheader("🤖 Next Month Expense Prediction (Simple Linear Trend)")
 
 try:
-    month_num = df['Date'].dt.month.values.reshape(-1, 1)
-    amounts = df['Amount'].values
-    model = LinearRegression().fit(month_num, amounts)
-    pred = model.predict([[month_num.max() + 1]])
-    st.info(f"📅 Predicted Next Month’s Expense: ₹{pred[0]:,.2f}")
+    month_num = df['MonthNum'].to_numpy()
+    next_month = month_num.max() + 1  # raises on empty data
+    slope, intercept = fit_line(month_num, df['Amount'].to_numpy(np.float64))
+    pred = slope * next_month + intercept
+    st.info(f"📅 Predicted Next Month’s Expense: ₹{pred:,.2f}")
 except Exception:
     st.info("Not enough data to predict next month’s expenses.")
 
@@ -165,7 +341,10 @@ except Exception:
 # ALL TRANSACTIONS TABLE
 # -----------------------------------
 st.subheader("🧾 Detailed Transactions")
-st.dataframe(df.sort_values('Date', ascending=False))
+with st.expander("Show all transactions", expanded=False):
+    if st.checkbox("Load transaction table", key="show_transactions"):
+        # Rows are already date-sorted: reversing gives newest first without a sort
+        st.dataframe(df.iloc[::-1], use_container_width=True)
 
 # -----------------------------------
 # DOWNLOAD SECTION
@@ -177,19 +356,19 @@ output = pd.DataFrame({
     "Category": category_summary.index,
     "Total Spent": category_summary.values
 })
-excel_path = "financial_summary.xlsx"
-output.to_excel(excel_path, index=False)
-
-with open(excel_path, "rb") as f:
-    st.download_button(
-        label="⬇️ Download Excel Summary",
-        data=f,
-        file_name="financial_summary.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+excel_buf = BytesIO()
+with pd.ExcelWriter(excel_buf, engine="xlsxwriter") as writer:
+    output.to_excel(writer, index=False)
+
+st.download_button(
+    label="⬇️ Download Excel Summary",
+    data=excel_buf.getvalue(),
+    file_name="financial_summary.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
 
 # CSV download
-csv_data = df.to_csv(index=False).encode('utf-8')
+csv_data = to_csv_bytes(df, (data_key, tuple(categories), start_date, end_date))
 st.download_button(
     "⬇️ Download Cleaned CSV",
     csv_data,
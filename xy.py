@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import plotly.express as px
 import os
+import contextlib
+import hashlib
+import tempfile
+import time
+from io import BytesIO
 
 # -------------------------------
 # PAGE CONFIG
@@ -16,6 +21,158 @@ Here, you can upload your expense data, visualize your spending habits, and calc
 Let's get started 👇
 """)
 
+# -------------------------------
+# DATA LOADING (cached across reruns)
+# -------------------------------
+_MONTH_NAMES = np.array([
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+])
+
+
+# On-disk Parquet cache: private folder beside the script, "xy_" file prefix
+# (new.py cleans differently); bump the version whenever cleaning changes.
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".finance_cache")
+_CACHE_PREFIX = "xy"
+_CLEAN_VERSION = 2
+_CACHE_MAX_FILES = 20
+_CACHE_MAX_AGE = 7 * 24 * 3600  # seconds
+
+
+# Drop this app's copies older than _CACHE_MAX_AGE, then all but the newest
+# _CACHE_MAX_FILES, so uploaded data is neither kept forever nor unbounded
+def prune_cache():
+    paths = [
+        os.path.join(_CACHE_DIR, name) for name in os.listdir(_CACHE_DIR)
+        if name.startswith(f"{_CACHE_PREFIX}_") and name.endswith((".parquet", ".tmp"))
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    cutoff = time.time() - _CACHE_MAX_AGE
+    for i, path in enumerate(paths):
+        if i >= _CACHE_MAX_FILES or os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+# Read and clean the uploaded CSV; None if a required column is missing
+def parse_and_clean(file_bytes):
+    buf = BytesIO(file_bytes)
+
+    # Read only the header to map normalized names back to the file's own
+    raw_cols = pd.read_csv(buf, nrows=0).columns
+    names = dict(zip(raw_cols.str.strip().str.capitalize(), raw_cols))
+    required_cols = {'Date', 'Category', 'Amount'}
+    if not required_cols.issubset(names):
+        return None
+
+    read_kwargs = dict(
+        dtype={names['Category']: 'category', names['Amount']: 'float64'},
+        parse_dates=[names['Date']],
+    )
+    try:
+        # Try the multi-threaded pyarrow reader first, else the C engine
+        buf.seek(0)
+        df = pd.read_csv(buf, engine='pyarrow', **read_kwargs)
+    except (ImportError, ValueError):
+        buf.seek(0)
+        df = pd.read_csv(buf, engine='c', **read_kwargs)
+    df.columns = df.columns.str.strip().str.capitalize()  # Normalize headers
+
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df.dropna(subset=['Date'], inplace=True)
+
+    # int8 month numbers with the names as category labels; Amount is kept
+    # float64 so the ₹ totals stay correct to the paisa
+    df['MonthNum'] = df['Date'].dt.month.astype('int8')
+    df['Month'] = pd.Categorical.from_codes(df['MonthNum'] - 1, _MONTH_NAMES)
+
+    # Date-sorted rows make each calendar month a contiguous run
+    return df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+
+
+# Memory cache per upload, backed by a Parquet copy that outlives restarts
+@st.cache_data(show_spinner=False)
+def load_and_clean(file_bytes):
+    digest = hashlib.md5(file_bytes).hexdigest()
+    cache_path = os.path.join(_CACHE_DIR, f"{_CACHE_PREFIX}_{digest}_v{_CLEAN_VERSION}.parquet")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < _CACHE_MAX_AGE:
+            return pd.read_parquet(cache_path, engine='pyarrow')
+    except (OSError, ValueError):
+        pass  # missing or unreadable copy: rebuild it below
+
+    df = parse_and_clean(file_bytes)
+    if df is not None:
+        tmp_path = None
+        try:
+            os.makedirs(_CACHE_DIR, mode=0o700, exist_ok=True)
+            # Write under a temp name and rename, so no session reads a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, prefix=f"{_CACHE_PREFIX}_", suffix=".tmp")
+            os.close(fd)
+            df.to_parquet(tmp_path, engine='pyarrow')
+            os.replace(tmp_path, cache_path)
+            tmp_path = None
+            prune_cache()
+        except (OSError, ValueError, TypeError):
+            # the on-disk copy is only an optimization (e.g. mixed-type columns)
+            if tmp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+    return df
+
+
+# Cached on (path, mtime) so a modified file is re-read
+@st.cache_data(show_spinner=False)
+def load_local(path, mtime):
+    with open(path, "rb") as f:
+        return load_and_clean(f.read())
+
+
+# Month and Category filters compare integer codes, never the label strings
+def isin_codes(col, values):
+    codes = col.cat.codes.to_numpy()
+    wanted = col.cat.categories.get_indexer(values)
+    wanted = wanted[wanted >= 0]
+    if pd.isna(values).any():
+        wanted = np.append(wanted, -1)  # NaN is selected: keep rows with a blank Category
+    wanted = wanted.astype(codes.dtype)
+    if len(wanted) > 4:
+        return np.isin(codes, wanted)
+    mask = np.zeros(len(codes), dtype=bool)
+    for code in wanted:
+        mask |= codes == code
+    return mask
+
+
+# Category and month totals via bincount; cached on data_key and the two filters
+@st.cache_data(show_spinner=False)
+def summarize(_df, data_key, months, categories):
+    # Category codes are dense ints, so a weighted bincount does the group-sum in
+    # one pass; code -1 (missing category) is dropped like groupby would.
+    cat_index = _df['Category'].cat.categories
+    codes = _df['Category'].cat.codes.to_numpy()
+    valid = codes >= 0
+    codes = codes[valid]
+    sums = np.bincount(codes, weights=_df['Amount'].to_numpy()[valid], minlength=len(cat_index))
+    seen = np.bincount(codes, minlength=len(cat_index)) > 0
+    category_summary = pd.Series(sums[seen], index=cat_index[seen], name='Amount')
+    category_summary.index.name = 'Category'
+    if _df.empty:
+        monthly_summary = pd.Series(dtype=float)
+    else:
+        # Months are a fixed 1-12 range: one weighted bincount replaces the
+        # groupby, and only months that actually have rows are kept.
+        month_num = _df['MonthNum'].to_numpy()
+        sums = np.bincount(month_num, weights=_df['Amount'].to_numpy(), minlength=13)[1:]
+        present = np.bincount(month_num, minlength=13)[1:] > 0
+        monthly_summary = pd.Series(
+            sums[present],
+            index=pd.CategoricalIndex(
+                _MONTH_NAMES[present], categories=_MONTH_NAMES, ordered=True, name='Month'
+            ),
+        )
+    return category_summary, monthly_summary
+
+
 # -------------------------------
 # USER INPUTS
 # -------------------------------
@@ -29,7 +186,9 @@ use_local_file = st.sidebar.checkbox("📂 Use local CSV file from Downloads")
 if use_local_file:
     file_path = r"C:\Users\IT LAB-002\Downloads\Datasets - expenses.csv (1).csv"
     if os.path.exists(file_path):
-        df = pd.read_csv(r"C:\Users\sunro\Downloads\Datasets - expenses.csv")
+        local_path = r"C:\Users\sunro\Downloads\Datasets - expenses.csv"
+        data_key = (local_path, os.path.getmtime(local_path))
+        df = load_local(*data_key)
         st.success("✅ Local file loaded successfully!")
     else:
         st.error("❌ File not found. Please check the file path.")
@@ -37,7 +196,9 @@ if use_local_file:
 else:
     uploaded_file = st.file_uploader("📤 Upload your Expense CSV file", type=["csv"])
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        file_bytes = uploaded_file.getvalue()
+        data_key = hashlib.md5(file_bytes).hexdigest()
+        df = load_and_clean(file_bytes)
         st.success("✅ File uploaded successfully!")
     else:
         st.info("Please upload a CSV file or select local file option from sidebar.")
@@ -46,17 +207,10 @@ else:
 # -------------------------------
 # DATA PREPARATION
 # -------------------------------
-df.columns = [col.strip().capitalize() for col in df.columns]
-
-required_cols = {'Date', 'Category', 'Amount'}
-if not required_cols.issubset(df.columns):
-    st.error(f"Your file must contain columns: {', '.join(required_cols)}")
+if df is None:
+    st.error("Your file must contain columns: Date, Category, Amount")
     st.stop()
 
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-df.dropna(subset=['Date'], inplace=True)
-df['Month'] = df['Date'].dt.month_name()
-
 # -------------------------------
 # FILTER SECTION
 # -------------------------------
@@ -68,13 +222,14 @@ categories = df['Category'].unique().tolist()
 selected_months = st.sidebar.multiselect("📅 Select Month(s):", months, default=months)
 selected_categories = st.sidebar.multiselect("🏷️ Select Category(s):", categories, default=categories)
 
-filtered_df = df[(df['Month'].isin(selected_months)) & (df['Category'].isin(selected_categories))]
+filtered_df = df[isin_codes(df['Month'], selected_months) & isin_codes(df['Category'], selected_categories)]
 
 # -------------------------------
 # CALCULATIONS
 # -------------------------------
-category_summary = filtered_df.groupby('Category')['Amount'].sum().sort_values(ascending=False)
-monthly_summary = filtered_df.groupby('Month')['Amount'].sum().sort_index()
+category_summary, monthly_summary = summarize(
+    filtered_df, data_key, tuple(selected_months), tuple(selected_categories)
+)
 
 avg_expense = np.mean(monthly_summary) if not monthly_summary.empty else 0
 total_expense = filtered_df['Amount'].sum()
@@ -104,10 +259,8 @@ tab1, tab2, tab3 = st.tabs(["Category View", "Monthly Trend", "Data Table"])
 
 with tab1:
     st.bar_chart(category_summary)
-    fig1, ax1 = plt.subplots()
-    ax1.pie(category_summary, labels=category_summary.index, autopct='%1.1f%%', startangle=90)
-    ax1.axis("equal")
-    st.pyplot(fig1)
+    fig_pie = px.pie(names=category_summary.index, values=category_summary.values)
+    st.plotly_chart(fig_pie, use_container_width=True, key="fig_pie")
 
 with tab2:
     st.line_chart(monthly_summary)
@@ -120,7 +273,7 @@ with tab3:
 # -------------------------------
 st.write("## 💡 Insights & Highlights")
 
-top3 = category_summary.head(3)
+top3 = category_summary.nlargest(3)  # heap select, no full sort
 if not top3.empty:
     st.write("### 🏆 Top 3 Spending Categories:")
     for cat, val in top3.items():
@@ -143,15 +296,15 @@ output = pd.DataFrame({
     "Total Spent": category_summary.values
 })
 
-excel_path = "financial_summary.xlsx"
-output.to_excel(excel_path, index=False)
+excel_buf = BytesIO()
+with pd.ExcelWriter(excel_buf, engine="xlsxwriter") as writer:
+    output.to_excel(writer, index=False)
 
-with open(excel_path, "rb") as f:
-    st.download_button(
-        label="⬇️ Download Excel Report",
-        data=f,
-        file_name="financial_summary.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+st.download_button(
+    label="⬇️ Download Excel Report",
+    data=excel_buf.getvalue(),
+    file_name="financial_summary.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
 
 st.caption("💡 Tip: Use the filters in the sidebar to analyze specific months or categories.")